@@ -16,20 +16,68 @@ Usage:
   python spark_eventlog_analyze.py -o run-1.csv /path/to/eventlog.json
   python spark_eventlog_analyze.py --output-file run-2.csv /path/to/eventlog.json.gz
   python spark_eventlog_analyze.py /path/to/eventlog.zip
+  python spark_eventlog_analyze.py -j 4 -o run-3.csv /path/to/eventlog-1.zip /path/to/eventlog-2.zip
+  python spark_eventlog_analyze.py --cache-dir ~/.cache/emr-tpcds -o run-1.csv /path/to/eventlog.zip
+  python spark_eventlog_analyze.py -o run-1.parquet /path/to/eventlog.zip
 """
 
 import argparse
-import csv
+import array
 import gzip
+import hashlib
+import io
 import json
+import mmap
+import os
 import re
+import shutil
 import statistics
 import sys
 import zipfile
-import io
+import numpy as np
 from pprint import pprint
 from collections import defaultdict
-from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# orjson parses event log lines several times faster than the stdlib json module;
+# fall back to ujson or json so the script still runs without it.
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        _json = json
+
+# Substrings of the only event types we handle; other lines are skipped before JSON parsing.
+_WANTED = (b"SparkListenerTaskEnd", b"SparkListenerJobStart", b"SQLExecutionStart", b"SQLExecutionEnd")
+
+# Per-task columns (name, array typecode), one compact array per metric indexed by task row.
+_TASK_COLUMNS = (
+    ("stageId", "q"),
+    ("launch", "q"),
+    ("finish", "q"),
+    ("duration_ms", "q"),
+    ("run_ms", "q"),
+    ("cpu_ns", "q"),
+    ("deserialize_ms", "q"),
+    ("result_serialize_ms", "q"),
+    ("gc_ms", "q"),
+    ("shuffle_fetch_wait_ms", "q"),
+    ("shuffle_write_time_ns", "d"),
+    ("shuffle_read_bytes", "q"),
+    ("shuffle_write_bytes", "q"),
+    ("input_bytes", "q"),
+    ("output_bytes", "q"),
+    ("success", "b"),
+)
+_MISSING = -1  # stands in for an absent launch/finish time in the integer columns
+
+# Read buffer for compressed logs: large reads amortize the per-call inflate overhead.
+_READ_BUFFER_SIZE = 1 << 20
+
+# Pulls stage ids straight out of a raw JobStart line that only carries "Stage Infos".
+_STAGE_ID_RE = re.compile(rb'"Stage ID"\s*:\s*(\d+)')
 
 # ---------- helpers ----------
 
@@ -40,6 +88,22 @@ def _g(d, *keys, default=None):
             return d[k]
     return default
 
+_ABSENT = object()
+
+def _g2(d, a, b, default=None):
+    """_g specialized for two keys (no varargs tuple, no loop); d must be a dict (callers normalize odd shapes)."""
+    v = d.get(a, _ABSENT)
+    return d.get(b, default) if v is _ABSENT else v
+
+def _g3(d, a, b, c, default=None):
+    """_g specialized for three keys; d must be a dict."""
+    v = d.get(a, _ABSENT)
+    if v is _ABSENT:
+        v = d.get(b, _ABSENT)
+        if v is _ABSENT:
+            return d.get(c, default)
+    return v
+
 def _norm_properties(props):
     """
     Normalize JobStart.Properties into a dict.
@@ -67,28 +131,69 @@ def _norm_properties(props):
         return out
     return {}
 
-@contextmanager
-def _open_maybe_gz_or_zip(path):
-    if path.endswith(".gz"):
-        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
-            yield f
-    elif path.endswith(".zip"):
-        with zipfile.ZipFile(path, 'r') as z:
-            names = z.namelist()
-            with z.open(names[0]) as fb:
-                with io.TextIOWrapper(fb, encoding="utf-8") as f:
-                    yield f
-    else:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            yield f
+class _OpenLog:
+    """
+    Open an event log (.gz, .zip or plain) in binary mode; entering yields an iterable of
+    raw bytes lines, which the JSON parser consumes directly without a separate UTF-8 decode pass.
+    Everything opened along the way is closed on exit, innermost first.
+    """
 
-def _ms_from_ns(ns_val):
+    def __init__(self, path):
+        self.path = path
+        self._opened = []
+
+    def _push(self, resource):
+        self._opened.append(resource)
+        return resource
+
+    def __enter__(self):
+        path = self.path
+        try:
+            if path.endswith(".gz"):
+                return self._push(io.BufferedReader(gzip.open(path, "rb"), buffer_size=_READ_BUFFER_SIZE))
+            if path.endswith(".zip"):
+                z = self._push(zipfile.ZipFile(path, 'r'))
+                names = z.namelist()
+                return self._push(io.BufferedReader(z.open(names[0]), buffer_size=_READ_BUFFER_SIZE))
+            f = self._push(open(path, "rb"))
+            if os.fstat(f.fileno()).st_size == 0:
+                return f  # an empty file cannot be mapped
+            return _mmap_lines(self._push(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        while self._opened:
+            self._opened.pop().close()
+
+def _mmap_lines(mm):
+    """
+    Yield the lines of a memory-mapped file (newline included, like file iteration).
+    Lines are sliced out as bytes rather than memoryviews, since the substring
+    prefilter and the stage id regex need real bytes objects.
+    """
+    find = mm.find
+    start, end = 0, len(mm)
+    while start < end:
+        nl = find(b"\n", start)
+        if nl < 0:
+            yield mm[start:]
+            return
+        yield mm[start:nl + 1]
+        start = nl + 1
+
+def _as_float(x, default=0.0):
+    if type(x) is int or type(x) is float:
+        return float(x)
     try:
-        return float(ns_val) / 1e6
+        return float(x)
     except Exception:
-        return 0.0
+        return default
 
 def _as_int(x, default=0):
+    if type(x) is int:  # what the JSON parser hands back for nearly every field
+        return x
     try:
         return int(x)
     except Exception:
@@ -100,208 +205,308 @@ def _success_from_task_end(ev):
       ev["Task End Reason"] may be a string "Success" or an object with Reason=Success.
     If we can't tell, we default to True to avoid dropping data.
     """
-    r = _g(ev, "Task End Reason", "taskEndReason", default=None)
+    r = _g2(ev, "Task End Reason", "taskEndReason", default=None)
     if r is None:
         return True
     if isinstance(r, str):
         return r.lower() == "success"
     if isinstance(r, dict):
-        reason = _g(r, "Reason", "reason", default=None)
+        reason = _g2(r, "Reason", "reason", default=None)
         if isinstance(reason, str):
             return reason.lower() == "success"
     rs = str(r)
     return ("Success" in rs) or ("org.apache.spark.Success" in rs)
 
-def analyze_sql_breakdown(paths):
+def _add_task_end(ev, task_index, task_cols):
     """
-    Parse one or more event log files (JSON lines) and return a list of dicts with per-execution stats.
+    Hot path: extract one TaskEnd event's metrics and write them straight into the
+    per-task columns (task_cols, in _TASK_COLUMNS order). A (stageId, taskId) seen
+    before only replaces its row when the stored attempt failed and this one succeeded.
     """
+    task_success = task_cols[-1]  # "success" is the last column
+
+    stageId = _as_int(_g2(ev, "Stage ID", "stageId", default=None), default=None)
+    if stageId is None:
+        return
+
+    taskInfo = _g3(ev, "Task Info", "taskInfo", "TaskInfo")
+    taskInfo = taskInfo if type(taskInfo) is dict else {}
+    task_id = _as_int(_g3(taskInfo, "Task ID", "taskId", "TaskId", default=None), default=None)
+    key = (stageId, task_id)
+    success = _success_from_task_end(ev)
+
+    # Decide before touching the metrics whether this attempt would be kept at all
+    idx = task_index.get(key)
+    if idx is not None and (task_success[idx] or not success):
+        return
+
+    metrics = _g3(ev, "Task Metrics", "taskMetrics", "TaskMetrics")
+    metrics = metrics if type(metrics) is dict else {}
+    launch = _g2(taskInfo, "Launch Time", "launchTime")
+    finish = _g2(taskInfo, "Finish Time", "finishTime")
+    launch_i = _as_int(launch, default=None) if launch is not None else None
+    finish_i = _as_int(finish, default=None) if finish is not None else None
+    run_ms = _as_int(_g2(metrics, "Executor Run Time", "executorRunTime", default=0), default=0)
+    if launch_i is not None and finish_i is not None:
+        duration_ms = max(0, finish_i - launch_i)
+    else:
+        duration_ms = run_ms
+    cpu_ns = _as_int(_g2(metrics, "Executor CPU Time", "executorCpuTime", default=0), default=0)
+
+    deser_ms = _as_int(_g2(metrics, "Executor Deserialize Time",
+                           "executorDeserializeTime", default=0), default=0)
+    result_ser_ms = _as_int(_g2(metrics, "Result Serialization Time",
+                                "resultSerializationTime", default=0), default=0)
+    gc_ms = _as_int(_g3(metrics, "JVM GC Time", "JvmGcTime", "jvmGcTime", default=0), default=0)
+
+    shuffle_read = _g2(metrics, "Shuffle Read Metrics", "shuffleReadMetrics")
+    shuffle_read = shuffle_read if type(shuffle_read) is dict else {}
+    shuffle_write = _g2(metrics, "Shuffle Write Metrics", "shuffleWriteMetrics")
+    shuffle_write = shuffle_write if type(shuffle_write) is dict else {}
+    input_metrics = _g2(metrics, "Input Metrics", "inputMetrics")
+    input_metrics = input_metrics if type(input_metrics) is dict else {}
+    output_metrics = _g2(metrics, "Output Metrics", "outputMetrics")
+    output_metrics = output_metrics if type(output_metrics) is dict else {}
+
+    shuffle_fetch_wait_ms = _as_int(_g2(shuffle_read, "Fetch Wait Time",
+                                        "fetchWaitTime", default=0), default=0)
+    shuffle_read_bytes = _as_int(_g2(shuffle_read, "Remote Bytes Read",
+                                     "remoteBytesRead", default=0), default=0)
+    shuffle_read_bytes += _as_int(_g2(shuffle_read, "Local Bytes Read",
+                                      "localBytesRead", default=0), default=0)
+
+    shuffle_write_time_ns = _as_float(_g2(shuffle_write, "Write Time",
+                                          "writeTime", default=0))
+    shuffle_write_bytes = _as_int(_g2(shuffle_write, "Bytes Written",
+                                      "bytesWritten", default=0), default=0)
+
+    input_bytes = _as_int(_g2(input_metrics, "Bytes Read", "bytesRead", default=0), default=0)
+    output_bytes = _as_int(_g2(output_metrics, "Bytes Written", "bytesWritten", default=0), default=0)
+
+    # values in _TASK_COLUMNS order
+    t_row = (
+        stageId,
+        launch_i if launch_i is not None else _MISSING,
+        finish_i if finish_i is not None else _MISSING,
+        duration_ms,
+        run_ms,
+        cpu_ns,
+        deser_ms,
+        result_ser_ms,
+        gc_ms,
+        shuffle_fetch_wait_ms,
+        shuffle_write_time_ns,
+        shuffle_read_bytes,
+        shuffle_write_bytes,
+        input_bytes,
+        output_bytes,
+        success,
+    )
+
+    if idx is None:
+        task_index[key] = len(task_success)
+        for col, v in zip(task_cols, t_row):
+            col.append(v)
+    else:
+        for col, v in zip(task_cols, t_row):
+            col[idx] = v
 
-    # Maps we build while streaming
+def _dense_lookup(mapping, ids):
+    """
+    Vectorized mapping.get(id, _MISSING) over an int64 array of ids. Spark assigns stage
+    and job ids densely from 0, so the dict is expanded into a table indexed by id.
+    """
+    table = np.full(max(mapping, default=-1) + 1, _MISSING, dtype=np.int64)
+    if mapping:
+        table[np.fromiter(mapping.keys(), dtype=np.int64)] = np.fromiter(mapping.values(), dtype=np.int64)
+    out = np.full(len(ids), _MISSING, dtype=np.int64)
+    known = (ids >= 0) & (ids < len(table))
+    out[known] = table[ids[known]]
+    return out
+
+def _parse_eventlog(path):
+    """
+    Stream one event log file (JSON lines) and return the maps built from it:
+    (exec_info, exec_jobs, job_exec, stage_job, task_index, tasks).
+    """
     exec_info = {}                 # executionId -> {description, details, startTime, endTime}
     exec_jobs = defaultdict(set)   # executionId -> set(jobIds)
     job_exec = {}                  # jobId -> executionId
     stage_job = {}                 # stageId -> jobId
-    tasks_by_key = {}              # (stageId, taskId) -> task record (prefer success)
+    task_index = {}                # (stageId, taskId) -> task row (prefer success)
+    tasks = {name: array.array(code) for name, code in _TASK_COLUMNS}
+    task_cols = list(tasks.values())
 
-    # Streaming parse
-    for path in paths:
-        with _open_maybe_gz_or_zip(path) as f:
-            for line in f:
-                if not line.strip():
-                    continue
+    with _OpenLog(path) as f:
+        for line in f:
+            if not any(w in line for w in _WANTED):
+                continue
+            try:
+                ev = _json.loads(line)
+            except Exception:
+                # invalid UTF-8 is rejected when parsing bytes, retry with replacement chars
                 try:
-                    ev = json.loads(line)
+                    ev = _json.loads(line.decode("utf-8", errors="replace"))
                 except Exception:
                     continue
 
-                et = _g(ev, "Event", "event")
-                if not et:
+            et = _g(ev, "Event", "event")
+            if not et:
+                continue
+
+            # --- SQL start/end/info ---
+            if et in ("org.apache.spark.sql.execution.ui.SparkListenerSQLExecutionStart",
+                      "SparkListenerSQLExecutionStart"):
+                exid = _as_int(_g(ev, "executionId", "Execution ID", default=None), default=None)
+                if exid is None:
+                    continue
+                exec_info.setdefault(exid, {})
+                exec_info[exid]["description"] = (_g(ev, "description", "Description", default="") or "").strip()
+                exec_info[exid]["details"] = _g(ev, "details", "Details", default="")
+                st = _g(ev, "time", "Time", "startTime", "Start Time", default=None)
+                if st is not None:
+                    exec_info[exid]["startTime"] = _as_int(st, default=None)
+
+            elif et in ("org.apache.spark.sql.execution.ui.SparkListenerSQLExecutionEnd",
+                        "SparkListenerSQLExecutionEnd"):
+                exid = _as_int(_g(ev, "executionId", "Execution ID", default=None), default=None)
+                if exid is not None:
+                    ex = exec_info.setdefault(exid, {})
+                    en = _g(ev, "time", "Time", "endTime", "End Time", default=None)
+                    if en is not None:
+                        ex["endTime"] = _as_int(en, default=None)
+
+            # --- JobStart: tie job -> executionId and stageIds -> jobId ---
+            elif et == "SparkListenerJobStart":
+                jobId = _as_int(_g(ev, "Job ID", "jobId", default=None), default=None)
+                if jobId is None:
                     continue
 
-                # --- SQL start/end/info ---
-                if et in ("org.apache.spark.sql.execution.ui.SparkListenerSQLExecutionStart",
-                          "SparkListenerSQLExecutionStart"):
-                    exid = _as_int(_g(ev, "executionId", "Execution ID", default=None), default=None)
-                    if exid is None:
-                        continue
-                    exec_info.setdefault(exid, {})
-                    exec_info[exid]["description"] = (_g(ev, "description", "Description", default="") or "").strip()
-                    exec_info[exid]["details"] = _g(ev, "details", "Details", default="")
-                    st = _g(ev, "time", "Time", "startTime", "Start Time", default=None)
-                    if st is not None:
-                        exec_info[exid]["startTime"] = _as_int(st, default=None)
-
-                elif et in ("org.apache.spark.sql.execution.ui.SparkListenerSQLExecutionEnd",
-                            "SparkListenerSQLExecutionEnd"):
-                    exid = _as_int(_g(ev, "executionId", "Execution ID", default=None), default=None)
-                    if exid is not None:
-                        ex = exec_info.setdefault(exid, {})
-                        en = _g(ev, "time", "Time", "endTime", "End Time", default=None)
-                        if en is not None:
-                            ex["endTime"] = _as_int(en, default=None)
-
-                # --- JobStart: tie job -> executionId and stageIds -> jobId ---
-                elif et == "SparkListenerJobStart":
-                    jobId = _as_int(_g(ev, "Job ID", "jobId", default=None), default=None)
-                    if jobId is None:
-                        continue
-
-                    stage_ids = _g(ev, "Stage IDs", "stageIds", default=None)
-                    if stage_ids is None:
-                        infos = _g(ev, "Stage Infos", "stageInfos", default=[]) or []
-                        stage_ids = [_as_int(_g(si, "Stage ID", "stageId"), default=None) for si in infos]
-                        stage_ids = [sid for sid in stage_ids if sid is not None]
-                    else:
-                        stage_ids = [_as_int(s, default=None) for s in stage_ids if s is not None]
-
-                    props = _norm_properties(_g(ev, "Properties", "properties", default={}))
-                    exid_str = props.get("spark.sql.execution.id")
-                    if exid_str is not None:
-                        try:
-                            exid = int(exid_str)
-                            job_exec[jobId] = exid
-                            exec_jobs[exid].add(jobId)
-                        except Exception:
-                            pass
-
-                    for sid in stage_ids:
-                        if sid is not None:
-                            stage_job[sid] = jobId
-
-                # --- TaskEnd: collect per-task metrics (we'll attribute to exec later) ---
-                elif et == "SparkListenerTaskEnd":
-                    stageId = _as_int(_g(ev, "Stage ID", "stageId", default=None), default=None)
-                    if stageId is None:
-                        continue
-
-                    taskInfo = _g(ev, "Task Info", "taskInfo", "TaskInfo", default={}) or {}
-                    metrics = _g(ev, "Task Metrics", "taskMetrics", "TaskMetrics", default={}) or {}
-
-                    task_id = _as_int(_g(taskInfo, "Task ID", "taskId", "TaskId", default=None), default=None)
-                    key = (stageId, task_id)
-
-                    launch = _g(taskInfo, "Launch Time", "launchTime")
-                    finish = _g(taskInfo, "Finish Time", "finishTime")
-                    launch_i = _as_int(launch, default=None) if launch is not None else None
-                    finish_i = _as_int(finish, default=None) if finish is not None else None
-                    if launch_i is not None and finish_i is not None:
-                        duration_ms = max(0, finish_i - launch_i)
-                    else:
-                        duration_ms = _as_int(_g(metrics, "Executor Run Time", "executorRunTime", default=0), default=0)
-
-                    run_ms = _as_int(_g(metrics, "Executor Run Time", "executorRunTime", default=0), default=0)
-                    cpu_ns = _as_int(_g(metrics, "Executor CPU Time", "executorCpuTime", default=0), default=0)
-                    cpu_ms = cpu_ns / 1e6
-
-                    deser_ms = _as_int(_g(metrics, "Executor Deserialize Time",
-                                          "executorDeserializeTime", default=0), default=0)
-                    result_ser_ms = _as_int(_g(metrics, "Result Serialization Time",
-                                               "resultSerializationTime", default=0), default=0)
-                    gc_ms = _as_int(_g(metrics, "JVM GC Time", "JvmGcTime", "jvmGcTime", default=0), default=0)
-
-                    shuffle_read = _g(metrics, "Shuffle Read Metrics", "shuffleReadMetrics", default={}) or {}
-                    shuffle_write = _g(metrics, "Shuffle Write Metrics", "shuffleWriteMetrics", default={}) or {}
-                    input_metrics = _g(metrics, "Input Metrics", "inputMetrics", default={}) or {}
-                    output_metrics = _g(metrics, "Output Metrics", "outputMetrics", default={}) or {}
-
-                    shuffle_fetch_wait_ms = _as_int(_g(shuffle_read, "Fetch Wait Time",
-                                                       "fetchWaitTime", default=0), default=0)
-                    shuffle_read_bytes = _as_int(_g(shuffle_read, "Remote Bytes Read",
-                                                    "remoteBytesRead", default=0), default=0)
-                    shuffle_read_bytes += _as_int(_g(shuffle_read, "Local Bytes Read",
-                                                     "localBytesRead", default=0), default=0)
-
-                    shuffle_write_time_ms = _ms_from_ns(_g(shuffle_write, "Write Time",
-                                                           "writeTime", default=0))
-                    shuffle_write_bytes = _as_int(_g(shuffle_write, "Bytes Written",
-                                                     "bytesWritten", default=0), default=0)
-
-                    input_bytes = _as_int(_g(input_metrics, "Bytes Read", "bytesRead", default=0), default=0)
-                    output_bytes = _as_int(_g(output_metrics, "Bytes Written", "bytesWritten", default=0), default=0)
-
-                    success = _success_from_task_end(ev)
-
-                    t_rec = {
-                        "stageId": stageId,
-                        "taskId": task_id,
-                        "launch": launch_i,
-                        "finish": finish_i,
-                        "duration_ms": duration_ms,
-                        "run_ms": run_ms,
-                        "cpu_ms": cpu_ms,
-                        "deserialize_ms": deser_ms,
-                        "result_serialize_ms": result_ser_ms,
-                        "gc_ms": gc_ms,
-                        "shuffle_fetch_wait_ms": shuffle_fetch_wait_ms,
-                        "shuffle_write_time_ms": shuffle_write_time_ms,
-                        "shuffle_read_bytes": shuffle_read_bytes,
-                        "shuffle_write_bytes": shuffle_write_bytes,
-                        "input_bytes": input_bytes,
-                        "output_bytes": output_bytes,
-                        "success": success,
-                    }
-
-                    prev = tasks_by_key.get(key)
-                    if prev is None or (not prev.get("success") and success):
-                        tasks_by_key[key] = t_rec
+                stage_ids = _g(ev, "Stage IDs", "stageIds", default=None)
+                if stage_ids is not None:
+                    stage_ids = [_as_int(s, default=None) for s in stage_ids if s is not None]
+                elif b'"Stage Infos"' in line and (found := _STAGE_ID_RE.findall(line)):
+                    stage_ids = [int(s) for s in found]
+                else:
+                    infos = _g(ev, "Stage Infos", "stageInfos", default=[]) or []
+                    stage_ids = [_as_int(_g(si, "Stage ID", "stageId"), default=None) for si in infos]
+                    stage_ids = [sid for sid in stage_ids if sid is not None]
+
+                props = _norm_properties(_g(ev, "Properties", "properties", default={}))
+                exid_str = props.get("spark.sql.execution.id")
+                if exid_str is not None:
+                    try:
+                        exid = int(exid_str)
+                        job_exec[jobId] = exid
+                        exec_jobs[exid].add(jobId)
+                    except Exception:
+                        pass
+
+                for sid in stage_ids:
+                    if sid is not None:
+                        stage_job[sid] = jobId
+
+            # --- TaskEnd: collect per-task metrics (we'll attribute to exec later) ---
+            elif et == "SparkListenerTaskEnd":
+                _add_task_end(ev, task_index, task_cols)
+
+    return exec_info, exec_jobs, job_exec, stage_job, task_index, tasks
+
+def analyze_sql_breakdown(paths, jobs=None):
+    """
+    Parse one or more event log files (JSON lines) and return a list of dicts with per-execution stats.
+    Files are parsed in parallel with up to `jobs` worker processes (default: one per CPU).
+    """
+    if len(paths) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(paths))) as ex:
+            parts = list(ex.map(_parse_eventlog, paths))
+    else:
+        parts = [_parse_eventlog(path) for path in paths]
+    if not parts:
+        return []
+
+    # Fold the per-file maps in path order, as if all files were streamed in one pass
+    exec_info, exec_jobs, job_exec, stage_job, task_index, tasks = parts[0]
+    task_cols = list(tasks.values())
+    task_success = tasks["success"]
+    for p_exec_info, p_exec_jobs, p_job_exec, p_stage_job, p_task_index, p_tasks in parts[1:]:
+        for exid, info in p_exec_info.items():
+            exec_info.setdefault(exid, {}).update(info)
+        for exid, job_ids in p_exec_jobs.items():
+            exec_jobs[exid] |= job_ids
+        job_exec.update(p_job_exec)
+        stage_job.update(p_stage_job)
+
+        p_cols = list(p_tasks.values())
+        p_success = p_tasks["success"]
+        for key, r in p_task_index.items():
+            idx = task_index.get(key)
+            if idx is None:
+                task_index[key] = len(task_success)
+                for col, p_col in zip(task_cols, p_cols):
+                    col.append(p_col[r])
+            elif not task_success[idx] and p_success[r]:
+                for col, p_col in zip(task_cols, p_cols):
+                    col[idx] = p_col[r]
 
     # Attribute deduped tasks -> (stage -> job -> execution)
-    tasks = list(tasks_by_key.values())
-    tasks_by_exec = defaultdict(list)
-
-    for t in tasks:
-        jobId = stage_job.get(t["stageId"])
-        if jobId is None:
-            continue
-        exid = job_exec.get(jobId)
-        if exid is None:
-            continue
-        tasks_by_exec[exid].append(t)
-
-    # Aggregate per execution
+    cols = {name: np.asarray(col) for name, col in tasks.items()}
+    exec_of_task = _dense_lookup(job_exec, _dense_lookup(stage_job, cols["stageId"]))
+
+    # Group task rows by execution; the stable sort keeps task order within each group
+    rows = np.flatnonzero(exec_of_task != _MISSING)
+    rows = rows[np.argsort(exec_of_task[rows], kind="stable")]
+    if not len(rows):
+        return []
+    exec_ids, starts, counts = np.unique(exec_of_task[rows], return_index=True, return_counts=True)
+
+    def seg_sum(name):
+        return np.add.reduceat(cols[name][rows], starts).tolist()
+
+    def seg_sum_ms_from_ns(name):
+        # sum in ns and convert once, which keeps the per-execution totals exact
+        return [v / 1e6 for v in seg_sum(name)]
+
+    no_launch = np.iinfo(np.int64).max
+    launch = cols["launch"][rows]
+    wall_starts = np.minimum.reduceat(np.where(launch == _MISSING, no_launch, launch), starts).tolist()
+    wall_ends   = np.maximum.reduceat(cols["finish"][rows], starts).tolist()  # _MISSING never beats a real time
+
+    task_slot = seg_sum("duration_ms")
+    run       = seg_sum("run_ms")
+    cpu       = seg_sum_ms_from_ns("cpu_ns")
+    deser     = seg_sum("deserialize_ms")
+    res_ser   = seg_sum("result_serialize_ms")
+    gc        = seg_sum("gc_ms")
+    fetch     = seg_sum("shuffle_fetch_wait_ms")
+    shw_time  = seg_sum_ms_from_ns("shuffle_write_time_ns")
+    in_b      = seg_sum("input_bytes")
+    out_b     = seg_sum("output_bytes")
+    sh_r_b    = seg_sum("shuffle_read_bytes")
+    sh_w_b    = seg_sum("shuffle_write_bytes")
+
+    # Aggregate per execution (np.unique returns exec_ids ascending, so results come out sorted)
     results = []
-    for exid, ts in tasks_by_exec.items():
-        if not ts:
-            continue
-
-        wall_start = min((t["launch"] for t in ts if t["launch"] is not None), default=None)
-        wall_end   = max((t["finish"] for t in ts if t["finish"] is not None), default=None)
-        makespan_ms = (wall_end - wall_start) if (wall_start is not None and wall_end is not None) else None
-
-        task_slot_ms = sum(t["duration_ms"] for t in ts)
-        run_ms       = sum(t["run_ms"] for t in ts)
-        cpu_ms       = sum(t["cpu_ms"] for t in ts)
-        deser_ms     = sum(t["deserialize_ms"] for t in ts)
-        result_ser   = sum(t["result_serialize_ms"] for t in ts)
-        gc_ms        = sum(t["gc_ms"] for t in ts)
-        fetch_wait   = sum(t["shuffle_fetch_wait_ms"] for t in ts)
-        shw_time_ms  = sum(t["shuffle_write_time_ms"] for t in ts)
-
-        in_bytes     = sum(t["input_bytes"] for t in ts)
-        out_bytes    = sum(t["output_bytes"] for t in ts)
-        sh_r_bytes   = sum(t["shuffle_read_bytes"] for t in ts)
-        sh_w_bytes   = sum(t["shuffle_write_bytes"] for t in ts)
+    for k, (exid, num_tasks) in enumerate(zip(exec_ids.tolist(), counts.tolist())):
+        wall_start, wall_end = wall_starts[k], wall_ends[k]
+        if wall_start != no_launch and wall_end != _MISSING:
+            makespan_ms = wall_end - wall_start
+        else:
+            makespan_ms = None
+
+        task_slot_ms = task_slot[k]
+        run_ms       = run[k]
+        cpu_ms       = cpu[k]
+        deser_ms     = deser[k]
+        result_ser   = res_ser[k]
+        gc_ms        = gc[k]
+        fetch_wait   = fetch[k]
+        shw_time_ms  = shw_time[k]
+
+        in_bytes     = in_b[k]
+        out_bytes    = out_b[k]
+        sh_r_bytes   = sh_r_b[k]
+        sh_w_bytes   = sh_w_b[k]
 
         # NEW: CPU vs Wall %
         if run_ms and run_ms > 0:
@@ -315,7 +520,7 @@ def analyze_sql_breakdown(paths):
             "executionId": exid,
             "description": desc,
             "num_jobs": len(exec_jobs.get(exid, [])),
-            "num_tasks": len(ts),
+            "num_tasks": num_tasks,
             "makespan_ms": makespan_ms,
             "task_slot_ms": task_slot_ms,
             "executor_run_ms": run_ms,
@@ -332,9 +537,12 @@ def analyze_sql_breakdown(paths):
             "shuffle_write_bytes": sh_w_bytes,
         })
 
-    results.sort(key=lambda r: r.get("executionId") or -1)
     return results
 
+def _csv_num(v):
+    # QUOTE_NONNUMERIC writes a missing value as an empty quoted string
+    return '""' if v is None else v
+
 def write_csv(f, rows):
     fieldnames = [
         "executionId",
@@ -356,29 +564,119 @@ def write_csv(f, rows):
         "shuffle_read_bytes",
         "shuffle_write_bytes",
     ]
-    w = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_NONNUMERIC)
-    w.writeheader()
-    for row in rows:
-        w.writerow(row)
-
+    # Same output as csv.DictWriter with QUOTE_NONNUMERIC: strings (and missing values) quoted, CRLF line ends,
+    # but each row is one %-format and the whole file goes out in a single write.
+    fmt = ",".join('"%s"' if name == "description" else "%s" for name in fieldnames)
+    lines = [",".join(f'"{name}"' for name in fieldnames)]
+    lines += [
+        fmt % (
+            row["executionId"],
+            row["description"].replace('"', '""'),
+            row["num_jobs"],
+            row["num_tasks"],
+            _csv_num(row["makespan_ms"]),
+            row["task_slot_ms"],
+            row["executor_run_ms"],
+            row["executor_cpu_ms"],
+            _csv_num(row["cpu_vs_wall_pct"]),
+            row["deserialize_ms"],
+            row["result_serialize_ms"],
+            row["gc_ms"],
+            row["shuffle_fetch_wait_ms"],
+            row["shuffle_write_time_ms"],
+            row["input_bytes"],
+            row["output_bytes"],
+            row["shuffle_read_bytes"],
+            row["shuffle_write_bytes"],
+        )
+        for row in rows
+    ]
+    f.write("\r\n".join(lines) + "\r\n")
+
+
+def write_parquet(path, rows):
+    import polars as pl  # only needed for parquet output
+
+    # explicit types, so columns that are all None (e.g. makespan_ms) keep a numeric type
+    schema = {
+        "executionId": pl.Int64,
+        "description": pl.String,
+        "num_jobs": pl.Int64,
+        "num_tasks": pl.Int64,
+        "makespan_ms": pl.Int64,
+        "task_slot_ms": pl.Int64,
+        "executor_run_ms": pl.Int64,
+        "executor_cpu_ms": pl.Float64,
+        "cpu_vs_wall_pct": pl.Float64,
+        "deserialize_ms": pl.Int64,
+        "result_serialize_ms": pl.Int64,
+        "gc_ms": pl.Int64,
+        "shuffle_fetch_wait_ms": pl.Int64,
+        "shuffle_write_time_ms": pl.Float64,
+        "input_bytes": pl.Int64,
+        "output_bytes": pl.Int64,
+        "shuffle_read_bytes": pl.Int64,
+        "shuffle_write_bytes": pl.Int64,
+    }
+    pl.DataFrame(rows, schema=schema).write_parquet(path)
+
+def _cache_file(cache_dir, paths, suffix):
+    """
+    Path of the cached output for analyzing `paths`. The key covers each event log's path, size and
+    mtime, plus this script itself so that changes to the analysis invalidate old entries.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for p in (__file__, *paths):
+        st = os.stat(p)
+        h.update(f"{os.path.abspath(p)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    return os.path.join(cache_dir, h.hexdigest() + suffix)
 
 def main():
     ap = argparse.ArgumentParser(description="Compute per-SQL breakdown from Spark event log(s).")
     ap.add_argument("eventlogs", nargs="+", help="Path(s) to Spark event log JSON (optionally .gz or .zip).")
-    ap.add_argument("-o", "--output-file", help="Path where to write CSV output (stdout by default).")
+    ap.add_argument("-o", "--output-file",
+                    help="Path where to write CSV output (stdout by default); a .parquet path writes Parquet instead.")
+    ap.add_argument("-j", "--jobs", type=int, default=None,
+                    help="Number of event logs to parse in parallel (one process per CPU by default).")
+    ap.add_argument("--cache-dir", help="Directory to cache results in; unchanged event logs are not parsed again.")
     args = ap.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        ap.error("argument -j/--jobs: must be a positive integer")
+
+    parquet = bool(args.output_file) and args.output_file.endswith(".parquet")
+    suffix = ".parquet" if parquet else ".csv"
+    cache_file = _cache_file(args.cache_dir, args.eventlogs, suffix) if args.cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        if args.output_file:
+            shutil.copyfile(cache_file, args.output_file)
+        else:
+            with open(cache_file, newline="", encoding="utf-8") as f:
+                shutil.copyfileobj(f, sys.stdout)
+        return
 
-    rows = analyze_sql_breakdown(args.eventlogs)
+    rows = analyze_sql_breakdown(args.eventlogs, jobs=args.jobs)
     if not rows:
         print("No SQL executions found (or no mappable tasks). "
               "Make sure the log contains SQL events and JobStart with spark.sql.execution.id.", file=sys.stderr)
         return 2
 
-    if args.output_file:
+    if parquet:
+        write_parquet(args.output_file, rows)
+    elif args.output_file:
         with open(args.output_file, "w", newline="", encoding="utf-8") as f:
             write_csv(f, rows)
     else:
         write_csv(sys.stdout, rows)
 
+    if cache_file:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        if args.output_file:
+            shutil.copyfile(args.output_file, tmp)
+        else:
+            with open(tmp, "w", newline="", encoding="utf-8") as f:
+                write_csv(f, rows)
+        os.replace(tmp, cache_file)  # atomic, so a concurrent run never reads a partial entry
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -12,6 +12,7 @@ Usage:
 
 import sys
 import argparse
+import numpy as np
 import polars as pl
 import matplotlib
 matplotlib.use("Agg")
@@ -19,17 +20,33 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 from matplotlib.ticker import PercentFormatter
 
-def read_spark_log_csv(config, run, path):
-    # read csv from spark_eventlog_analyzer.py
-    df = pl.read_csv(path)
+# types of the spark_eventlog_analyze.py CSV columns we use, so the scan does not need to infer them
+CSV_SCHEMA_OVERRIDES = {
+    "executionId": pl.Int64,
+    "description": pl.String,
+    "makespan_ms": pl.Float64,
+    "executor_run_ms": pl.Float64,
+    "executor_cpu_ms": pl.Float64,
+}
+
+def read_spark_log(config, run, path):
+    # lazily scan csv (or parquet) from spark_eventlog_analyzer.py, so only the columns and rows we keep get materialized
+    if path.suffix == ".parquet":
+        df = pl.scan_parquet(path)
+    else:
+        df = pl.scan_csv(path, schema_overrides=CSV_SCHEMA_OVERRIDES)
     # find the Spark queries that correspond to TPC-DS queries
     # and add query column to identify them and extract only the columns we care about
-    df = df.filter(pl.col('description').str.contains(r'benchmark q.*')).select(
+    # (descriptions come stripped from the analyzer, so a literal prefix test is enough, and
+    # unlike a regex polars can push it down into the scan)
+    df = df.filter(pl.col('description').str.starts_with("benchmark q")).select(
         pl.col('description').str.strip_prefix("benchmark ").str.strip_suffix("-v2.4").alias('query'),
         pl.col('executionId'),
-        pl.col('makespan_ms').alias('total_time'),
-        pl.col('executor_run_ms').alias('executor_time'),
-        pl.col('executor_cpu_ms').alias('executor_cpu_time'),
+        # parquet keeps integer columns as Int64 while csv reads them as Float64 (CSV_SCHEMA_OVERRIDES),
+        # so cast to one dtype to allow mixing both formats in a single concat
+        pl.col('makespan_ms').cast(pl.Float64).alias('total_time'),
+        pl.col('executor_run_ms').cast(pl.Float64).alias('executor_time'),
+        pl.col('executor_cpu_ms').cast(pl.Float64).alias('executor_cpu_time'),
     )
     # enhance with config and run columns
     df = df.select(pl.lit(config).alias('config'), pl.lit(run).alias('run'), pl.all())
@@ -50,7 +67,7 @@ def plot_scurve(df, metric, baseline, target, output_dir):
     # sort by ratio
     df = df.sort("ratio")
 
-    colors = df["ratio"].map_elements(lambda ratio: "green" if ratio >= 0 else "red")
+    colors = np.where(df["ratio"].to_numpy() >= 0, "green", "red")
 
     fig, ax = plt.subplots(figsize=(18, 9))
 
@@ -70,7 +87,7 @@ def plot_scurve(df, metric, baseline, target, output_dir):
 
 def main():
     ap = argparse.ArgumentParser(description="Compare TPC-DS results in analyzed Spark event log CSVs ")
-    ap.add_argument("csv_files", nargs="+", type=Path, help="Path(s) to analyzed Spark event log CSVs in form /path/to/{config}-{run}.csv, e.g. corretto-1.csv")
+    ap.add_argument("csv_files", nargs="+", type=Path, help="Path(s) to analyzed Spark event log CSVs (or .parquet files) in form /path/to/{config}-{run}.csv, e.g. corretto-1.csv")
     ap.add_argument("-o", "--output-dir", type=Path, default=Path.cwd(), help="Path where to write the resulting artifacts output (current directory by default).")
     ap.add_argument("--longer-than", type=float, default=0.0, help="Consider only queries where target runs at least this number of seconds")
     args = ap.parse_args()
@@ -88,8 +105,8 @@ def main():
 
     data_cols = ('total_time', 'executor_time', 'executor_cpu_time')
 
-    # load all data into one data frame (columns: config, run, executionId, query, total_time, etc.)
-    df = pl.concat(read_spark_log_csv(config, run, path) for config, run, path in ((*split_filename(p), p) for p in paths))
+    # build one lazy plan over all data (columns: config, run, executionId, query, total_time, etc.)
+    df = pl.concat(read_spark_log(config, run, path) for config, run, path in ((*split_filename(p), p) for p in paths))
 
     # aggregate over iterations intra-run by taking the last iteration (maximum executionId)
     df = df.filter(pl.col("executionId") == pl.col("executionId").max().over("config", "run", "query"))
@@ -97,6 +114,9 @@ def main():
     # aggregate over runs by taking mean
     df = df.group_by(["config", "query"]).agg([pl.col(col).mean() for col in data_cols])
 
+    # run the plan (pivot is only available on eager data frames)
+    df = df.collect(engine="streaming")
+
     # pivot, and create config specific columns, e.g. total_time-corretto
     df = df.pivot(on="config", index="query")
 